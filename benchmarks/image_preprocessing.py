@@ -0,0 +1,303 @@
+"""
+Benchmarks for the image preprocessing helpers in `src/utils/image_utils.py`
+and `src/data/preprocess.py`.
+
+Every case runs in a fresh process on a synthetic stack, and reports
+throughput (slices/sec), latency percentiles and peak RSS as JSON. The
+memory a case needs is its working set: peak RSS minus the RSS reached
+once the inputs are built, before the function first runs.
+
+Usage (from the repository root):
+    python -m benchmarks.image_preprocessing run --shape 64 512 512 --dtype uint8 --out base.json
+    python -m benchmarks.image_preprocessing run --cases normalize_slice normalize_volume --out new.json
+    python -m benchmarks.image_preprocessing compare base.json new.json --threshold 0.1
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing as mp
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+from src.data import preprocess
+from src.utils import image_utils
+from src.utils.image_utils import Denoiser
+
+def _as_uint8(stack):
+    return stack if stack.dtype == np.uint8 else image_utils.normalize_volume(stack)
+
+def _write_pngs(stack, workdir):
+    paths = []
+    for i, s in enumerate(stack if stack.dtype in (np.uint8, np.uint16) else _as_uint8(stack)):
+        path = os.path.join(workdir, f"{i:05d}.png")
+        Image.fromarray(s).save(path)
+        paths.append(path)
+    return paths
+
+# Each builder takes (stack, workdir) and returns (function, list of per-call inputs, slices per call)
+CASES = {
+    "normalize_slice": lambda stack, workdir: (image_utils.normalize_slice, list(stack), 1),
+    "normalize_slice_preprocess": lambda stack, workdir: (preprocess.normalize_slice, list(stack), 1),
+    "normalize_volume": lambda stack, workdir: (image_utils.normalize_volume, [stack], len(stack)),
+    "intensity_projection_max": lambda stack, workdir: (
+        lambda st: image_utils.intensity_projection(list(st), return_as_img=False, method='max'), [stack], len(stack)
+    ),
+    "intensity_projection_mean": lambda stack, workdir: (
+        lambda st: image_utils.intensity_projection(list(st), return_as_img=False, method='mean'), [stack], len(stack)
+    ),
+    "sliding_window_projection_max": lambda stack, workdir: (
+        lambda st: image_utils.sliding_window_projection(st, 2, method='max'), [stack], len(stack)
+    ),
+    "sliding_window_projection_mean": lambda stack, workdir: (
+        lambda st: image_utils.sliding_window_projection(st, 2, method='mean'), [stack], len(stack)
+    ),
+    "denoise_gaussian_blur": lambda stack, workdir: (
+        lambda s: Denoiser.denoise_gaussian_blur(Image.fromarray(s), radius=3), list(_as_uint8(stack)), 1
+    ),
+    "gaussian_blur_stack": lambda stack, workdir: (
+        lambda st: image_utils.gaussian_blur_stack(st, radius=3), [_as_uint8(stack)], len(stack)
+    ),
+    "denoise_bilateral_filter": lambda stack, workdir: (
+        lambda s: Denoiser.denoise_bilateral_filter(s), list(_as_uint8(stack)), 1
+    ),
+    "denoise_nlm": lambda stack, workdir: (lambda s: Denoiser.denoise_nlm(s), list(_as_uint8(stack)), 1),
+    "denoise_bm3d": lambda stack, workdir: (lambda s: Denoiser.denoise_bm3d(s), list(_as_uint8(stack)), 1),
+    "load_images_parallel": lambda stack, workdir: (
+        lambda paths: image_utils.load_images_parallel(paths, num_processes=4), [_write_pngs(stack, workdir)], len(stack)
+    ),
+    "stream_images": lambda stack, workdir: (
+        lambda paths: list(image_utils.stream_images(paths, num_workers=4)), [_write_pngs(stack, workdir)], len(stack)
+    ),
+}
+
+# BM3D takes seconds per slice, so it only runs when asked for explicitly
+DEFAULT_CASES = [name for name in CASES if name != "denoise_bm3d"]
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+def _run_case(name, shape, dtype, repeats, warmup, seed, start_method, conn):
+    """
+    Run one benchmark case in the current (fresh) process and send the result through `conn`.
+    """
+    # Spawned children default to 'spawn' too; keep the caller's start method for pools in the benchmarked code
+    mp.set_start_method(start_method, force=True)
+    rng = np.random.default_rng(seed)
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        stack = rng.integers(0, np.iinfo(dtype).max, size=shape, dtype=dtype, endpoint=True)
+    else:
+        stack = rng.random(shape, dtype=np.float32).astype(dtype)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        fn, inputs, slices_per_call = CASES[name](stack, workdir)
+        # Imports, the stack and the inputs, before the benchmarked function allocates anything
+        baseline_rss_mb = _peak_rss_mb()
+        for _ in range(warmup):
+            for item in inputs:
+                fn(item)
+
+        latencies = []
+        for _ in range(repeats):
+            for item in inputs:
+                start = time.perf_counter()
+                fn(item)
+                latencies.append(time.perf_counter() - start)
+
+    peak_rss_mb = _peak_rss_mb()
+    latencies = np.array(latencies)
+    conn.send({
+        "slices_per_sec": slices_per_call * len(latencies) / latencies.sum(),
+        "latency_ms": {
+            "mean": 1000 * latencies.mean(),
+            "p50": 1000 * np.percentile(latencies, 50),
+            "p90": 1000 * np.percentile(latencies, 90),
+            "p99": 1000 * np.percentile(latencies, 99),
+        },
+        "calls": len(latencies),
+        "slices_per_call": slices_per_call,
+        "baseline_rss_mb": baseline_rss_mb,
+        "peak_rss_mb": peak_rss_mb,
+        "working_set_mb": peak_rss_mb - baseline_rss_mb,
+    })
+    conn.close()
+
+def run_benchmarks(cases=None, shape=(32, 256, 256), dtype="uint8", repeats=5, warmup=1, seed=0):
+    """
+    Run benchmark cases, each in its own process so peak RSS is measured per function.
+
+    Args:
+        cases (list, optional): Names from `CASES`. Defaults to `DEFAULT_CASES`.
+        shape (tuple): Shape (N, H, W) of the synthetic stack.
+        dtype (str): Dtype of the synthetic stack, e.g. 'uint8', 'uint16' or 'float32'.
+        repeats (int): Number of timed passes over the inputs.
+        warmup (int): Number of untimed passes before timing.
+        seed (int): Seed of the synthetic data.
+
+    Returns:
+        dict: {"meta": {...}, "results": {case: {...}}}, ready to be dumped as JSON.
+    """
+    cases = DEFAULT_CASES if cases is None else cases
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {sorted(unknown)}. Available: {list(CASES)}")
+
+    start_method = mp.get_start_method()
+    ctx = mp.get_context("spawn")
+    results = {}
+    for name in cases:
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        process = ctx.Process(
+            target=_run_case, args=(name, tuple(shape), dtype, repeats, warmup, seed, start_method, child_conn)
+        )
+        process.start()
+        child_conn.close()
+        try:
+            results[name] = parent_conn.recv()
+        except EOFError:
+            results[name] = None
+        process.join()
+        if results[name] is None:
+            results[name] = {"error": f"benchmark process exited with code {process.exitcode}"}
+        print(f"{name:<32} {_format_result(results[name])}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+            "shape": list(shape),
+            "dtype": dtype,
+            "repeats": repeats,
+            "warmup": warmup,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+def _format_result(result):
+    if "error" in result:
+        return result["error"]
+    return (f"{result['slices_per_sec']:>10.1f} slices/s  p50 {result['latency_ms']['p50']:>9.3f} ms  "
+            f"p99 {result['latency_ms']['p99']:>9.3f} ms  working set {result['working_set_mb']:>8.1f} MB")
+
+# Runs are only comparable on the same input
+COMPARABLE_META = ("shape", "dtype")
+
+def compare_results(baseline, candidate, threshold=0.1, min_rss_change_mb=1.0):
+    """
+    Compare two benchmark runs and flag regressions.
+
+    A case regresses when its throughput drops, or its p50 latency or working
+    set grows, by more than `threshold` (relative) in `candidate` versus
+    `baseline`. Working-set growth must also exceed `min_rss_change_mb`, so that
+    allocator noise on cases that barely allocate is not flagged.
+
+    Args:
+        baseline (dict): Result of `run_benchmarks` (or its loaded JSON).
+        candidate (dict): Result to compare against the baseline.
+        threshold (float): Relative change tolerated before flagging.
+        min_rss_change_mb (float): Absolute working-set growth tolerated before flagging.
+
+    Returns:
+        dict: Per-case relative changes, a list of regression messages under "regressions",
+            and notes on run settings that differ (e.g. repeats) under "warnings".
+
+    Raises:
+        ValueError: If the runs used a different stack shape or dtype.
+    """
+    base_meta, new_meta = baseline["meta"], candidate["meta"]
+    mismatched = [key for key in COMPARABLE_META if base_meta.get(key) != new_meta.get(key)]
+    if mismatched:
+        raise ValueError("Cannot compare runs on different inputs: " + ", ".join(
+            f"{key} {base_meta.get(key)} vs {new_meta.get(key)}" for key in mismatched
+        ))
+
+    report = {"cases": {}, "regressions": [], "warnings": []}
+    for key in ("repeats", "warmup", "seed", "cpu_count"):
+        if base_meta.get(key) != new_meta.get(key):
+            report["warnings"].append(f"{key} differs: {base_meta.get(key)} vs {new_meta.get(key)}")
+    for name, base in baseline["results"].items():
+        new = candidate["results"].get(name)
+        if new is None or "error" in base or "error" in new:
+            continue
+        changes = {
+            "slices_per_sec": new["slices_per_sec"] / base["slices_per_sec"] - 1,
+            "latency_p50": new["latency_ms"]["p50"] / base["latency_ms"]["p50"] - 1,
+        }
+        rss_change_mb = None
+        if "working_set_mb" in base and "working_set_mb" in new:
+            rss_change_mb = new["working_set_mb"] - base["working_set_mb"]
+            changes["working_set_mb"] = rss_change_mb / max(base["working_set_mb"], min_rss_change_mb)
+        else:
+            report["warnings"].append(f"{name}: no working set in one of the runs, memory not compared")
+        report["cases"][name] = changes
+        if changes["slices_per_sec"] < -threshold:
+            report["regressions"].append(f"{name}: throughput {changes['slices_per_sec']:+.1%}")
+        if changes["latency_p50"] > threshold:
+            report["regressions"].append(f"{name}: p50 latency {changes['latency_p50']:+.1%}")
+        if rss_change_mb is not None and changes["working_set_mb"] > threshold and rss_change_mb > min_rss_change_mb:
+            report["regressions"].append(
+                f"{name}: working set {changes['working_set_mb']:+.1%} ({rss_change_mb:+.1f} MB)"
+            )
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the image preprocessing helpers.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmark cases and write JSON results.")
+    run_parser.add_argument("--cases", nargs="+", default=None, help=f"Cases to run. Available: {', '.join(CASES)}")
+    run_parser.add_argument("--shape", nargs=3, type=int, default=[32, 256, 256], metavar=("N", "H", "W"))
+    run_parser.add_argument("--dtype", default="uint8", choices=["uint8", "uint16", "float32"])
+    run_parser.add_argument("--repeats", type=int, default=5)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--out", default=None, help="Path of the JSON results (printed to stdout if omitted).")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two JSON results and flag regressions.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run_benchmarks(args.cases, args.shape, args.dtype, args.repeats, args.warmup, args.seed)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(results, f, indent=2)
+        else:
+            print(json.dumps(results, indent=2))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    try:
+        report = compare_results(baseline, candidate, args.threshold)
+    except ValueError as e:
+        print(f"ERROR {e}")
+        return 2
+    for message in report["warnings"]:
+        print(f"WARNING {message}")
+    for name, changes in report["cases"].items():
+        working_set = f"{changes['working_set_mb']:+8.1%}" if "working_set_mb" in changes else f"{'n/a':>8}"
+        print(f"{name:<32} throughput {changes['slices_per_sec']:+8.1%}  "
+              f"p50 {changes['latency_p50']:+8.1%}  working set {working_set}")
+    for message in report["regressions"]:
+        print(f"REGRESSION {message}")
+    return 1 if report["regressions"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
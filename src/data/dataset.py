@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from ..utils.image_utils import IntensityProjectionHelper, intensity_projection, load_image
+
+class SlabDataset(Dataset):
+    def __init__(self, series, helpers, num_slices=2, targets=None, transform=None, cache_size=64,
+                 prefetch_slices=None, num_prefetch_threads=1):
+        """
+        2.5D dataset of projected slabs, one sample per (series, slice) pair.
+
+        Each sample stacks one projection per helper over the slices
+        `[i - num_slices, i + num_slices]` of a series. Preprocessed slices are
+        kept in a per-worker LRU cache, so neighbouring indices reuse each
+        other's normalization and denoising, and upcoming slices of the same
+        series are preprocessed in a background thread.
+
+        Args:
+            series (dict or list): Mapping of series id to a list of image paths
+                (or a list of such lists). Paths are sorted by filename.
+            helpers (IntensityProjectionHelper or list): One output channel per helper.
+            num_slices (int): Number of neighbours on each side of the current slice.
+            targets (dict or list, optional): Per-series sequences of per-slice targets.
+                If given, samples are (slab, target) pairs.
+            transform (callable, optional): Applied to the uint8 (C, H, W) slab tensor.
+            cache_size (int): Maximum number of preprocessed slices kept per worker.
+            prefetch_slices (int, optional): Number of slices past the current window
+                to preprocess in the background. Defaults to `num_slices + 1`; 0 disables prefetching.
+            num_prefetch_threads (int): Background threads per worker.
+        """
+        if not isinstance(series, dict):
+            series = dict(enumerate(series))
+        if isinstance(helpers, IntensityProjectionHelper):
+            helpers = [helpers]
+        self.series = {key: sorted(paths, key=os.path.basename) for key, paths in series.items()}
+        self.helpers = list(helpers)
+        self.num_slices = num_slices
+        self.targets = targets
+        self.transform = transform
+        self.cache_size = cache_size
+        self.prefetch_slices = num_slices + 1 if prefetch_slices is None else prefetch_slices
+        self.num_prefetch_threads = num_prefetch_threads
+        self.index = [(key, i) for key, paths in self.series.items() for i in range(len(paths))]
+        self._init_worker_state()
+
+    def _init_worker_state(self):
+        # Caches and threads are per process; DataLoader workers rebuild them lazily
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._owner_pid = os.getpid()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ['_cache', '_pending', '_lock', '_executor', '_owner_pid']:
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_worker_state()
+
+    def __len__(self):
+        return len(self.index)
+
+    @staticmethod
+    def _preprocess_key(helper):
+        """
+        Helpers with the same normalization and denoising settings share cached slices.
+        """
+        denoiser_kwargs = tuple(sorted(helper.denoiser_kwargs.items())) if helper.denoise else None
+        return helper.normalize, helper.denoise, helper.denoiser_type, denoiser_kwargs
+
+    def _compute_slice(self, helper, series_key, slice_index):
+        img = load_image(self.series[series_key][slice_index])
+        return np.asarray(helper.preprocess_slice(img))
+
+    def _get_slice(self, helper, series_key, slice_index):
+        key = (self._preprocess_key(helper), series_key, slice_index)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            future = self._pending.get(key)
+
+        if future is not None:
+            slice_array = future.result()
+        else:
+            slice_array = self._compute_slice(helper, series_key, slice_index)
+        self._store(key, slice_array)
+        return slice_array
+
+    def _store(self, key, slice_array):
+        with self._lock:
+            self._pending.pop(key, None)
+            self._cache[key] = slice_array
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _prefetch_task(self, helper, key, series_key, slice_index):
+        slice_array = self._compute_slice(helper, series_key, slice_index)
+        self._store(key, slice_array)
+        return slice_array
+
+    def _prefetch(self, series_key, start, end):
+        if self.prefetch_slices <= 0:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_prefetch_threads)
+        end = min(end, len(self.series[series_key]))
+        for helper in self.helpers:
+            for slice_index in range(start, end):
+                key = (self._preprocess_key(helper), series_key, slice_index)
+                with self._lock:
+                    if key in self._cache or key in self._pending:
+                        continue
+                    self._pending[key] = self._executor.submit(
+                        self._prefetch_task, helper, key, series_key, slice_index
+                    )
+
+    def __getitem__(self, idx):
+        if self._owner_pid != os.getpid():
+            # Forked into a DataLoader worker: the parent's threads do not exist here
+            self._init_worker_state()
+
+        series_key, slice_index = self.index[idx]
+        start = max(0, slice_index - self.num_slices)
+        end = min(len(self.series[series_key]), slice_index + self.num_slices + 1)
+
+        projections = []
+        for helper in self.helpers:
+            slices = [self._get_slice(helper, series_key, i) for i in range(start, end)]
+            projections.append(intensity_projection(slices, return_as_img=False, method=helper.method))
+        self._prefetch(series_key, end, end + self.prefetch_slices)
+
+        # The stacked array is already contiguous, so from_numpy shares its memory
+        slab = torch.from_numpy(np.stack(projections, axis=0))
+        if self.transform is not None:
+            slab = self.transform(slab)
+        if self.targets is not None:
+            return slab, self.targets[series_key][slice_index]
+        return slab
@@ -4,6 +4,9 @@ import bm3d
 from concurrent.futures import ProcessPoolExecutor
 import cv2
 
+# Shared with the image utilities rather than duplicated; `normalize_volume` is re-exported
+from ..utils.image_utils import _integer_normalization_lut, normalize_volume
+
 def normalize_slice(slice_data):
     """
     Normalize slice data using 2nd and 98th percentiles.
@@ -21,22 +24,26 @@ def normalize_slice(slice_data):
     else:
         is_pil_image = False
     
-    # Calculate percentiles
-    p2 = np.percentile(slice_data, 2)
-    p98 = np.percentile(slice_data, 98)
-    
-    # Handle edge case where p98 == p2
-    if p98 == p2:
-        normalized = np.zeros_like(slice_data)  # Return a blank image
+    if slice_data.dtype in (np.uint8, np.uint16):
+        # Fast path: histogram percentiles and a per-level lookup table
+        normalized = np.take(_integer_normalization_lut(slice_data), slice_data)
     else:
-        # Clip the data to the percentile range
-        clipped_data = np.clip(slice_data, p2, p98)
+        # Calculate percentiles
+        p2 = np.percentile(slice_data, 2)
+        p98 = np.percentile(slice_data, 98)
         
-        # Normalize to [0, 255] range
-        normalized = 255 * (clipped_data - p2) / (p98 - p2)
-    
-    # Convert to uint8
-    normalized = np.uint8(normalized)
+        # Handle edge case where p98 == p2
+        if p98 == p2:
+            normalized = np.zeros_like(slice_data)  # Return a blank image
+        else:
+            # Clip the data to the percentile range
+            clipped_data = np.clip(slice_data, p2, p98)
+            
+            # Normalize to [0, 255] range
+            normalized = 255 * (clipped_data - p2) / (p98 - p2)
+        
+        # Convert to uint8
+        normalized = np.uint8(normalized)
     
     # Convert back to PIL image if the input was a PIL image
     if is_pil_image:
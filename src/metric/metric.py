@@ -11,7 +11,11 @@ from sklearn.metrics import (
     f1_score
 )
 
+import functools
+
+import numpy as np
 import torch
+import torch.distributed as dist
 
 def eval_roc_auc(label, score):
     """
@@ -35,6 +39,59 @@ def eval_roc_auc(label, score):
     return roc_auc
 
 
+def eval_recall_precision_at_k(label, score, k=None):
+    """
+    Recall and precision for the top k instances with the highest outlier
+    scores, for several k at once.
+
+    All k values are read off one descending sort and one cumulative sum of
+    the sorted labels, and every column of a 2D ``score`` is evaluated in the
+    same call.
+
+    Parameters
+    ----------
+    label : torch.Tensor
+        Labels in shape of ``(N, )`` or ``(N, B)``, where 1 represents outliers,
+        0 represents normal instances. A 1D label is shared by all score columns.
+    score : torch.Tensor
+        Outlier scores in shape of ``(N, )``, or ``(N, B)`` for a batch of
+        ``B`` score columns.
+    k : int, list or torch.Tensor, optional
+        The numbers of instances to evaluate. ``None`` for the number of
+        outliers in each column, i.e. recall and precision. Default: ``None``.
+
+    Returns
+    -------
+    recall_at_k : torch.Tensor
+        Recall in shape of ``(K, )`` or ``(K, B)`` for a list of k, and
+        ``()`` or ``(B, )`` for a single or default k.
+    precision_at_k : torch.Tensor
+        Precision, in the same shape as ``recall_at_k``.
+    """
+    label = torch.as_tensor(label, device=score.device)
+    if score.dim() == 2 and label.dim() == 1:
+        label = label[:, None].expand_as(score)
+    num_outliers = label.sum(0)
+
+    sorted_index = score.argsort(dim=0, descending=True)
+    hits = label.gather(0, sorted_index).cumsum(0)
+    if k is None:
+        # One k per column; a column without outliers has nothing to recall
+        k = num_outliers
+        hits_at_k = hits.gather(0, (k.clamp(min=1) - 1)[None])[0] * (k > 0)
+    else:
+        k = torch.as_tensor(k, device=score.device).long()
+        assert k.numel() > 0 and k.min() >= 1 and k.max() <= score.shape[0], \
+            f"Expect 1 <= k <= {score.shape[0]}, but got {k.tolist()}."
+        # Number of outliers among the top k, for every k and column
+        hits_at_k = hits[k - 1]
+        if score.dim() == 2 and k.dim() == 1:
+            k = k[:, None]
+    recall_at_k = hits_at_k / num_outliers
+    precision_at_k = hits_at_k / k
+    return recall_at_k, precision_at_k
+
+
 def eval_recall_at_k(label, score, k=None):
     """
     Recall score for top k instances with the highest outlier scores.
@@ -56,9 +113,7 @@ def eval_recall_at_k(label, score, k=None):
         Recall for top k instances with the highest outlier scores.
     """
 
-    if k is None:
-        k = sum(label)
-    recall_at_k = sum(label[score.topk(k).indices]) / sum(label)
+    recall_at_k, _ = eval_recall_precision_at_k(label, score, k)
     return recall_at_k
 
 
@@ -83,9 +138,7 @@ def eval_precision_at_k(label, score, k=None):
         Precision for top k instances with the highest outlier scores.
     """
 
-    if k is None:
-        k = sum(label)
-    precision_at_k = sum(label[score.topk(k).indices]) / k
+    _, precision_at_k = eval_recall_precision_at_k(label, score, k)
     return precision_at_k
 
 
@@ -133,47 +186,359 @@ def eval_f1(label, pred):
     return f1
 
 
-def _one_hot(x, n):
-    return (x.view(-1, 1) == torch.arange(n, dtype=x.dtype, device=x.device)).int()
+def _to_numpy(x):
+    if isinstance(x, torch.Tensor):
+        return x.detach().cpu().numpy()
+    return np.asarray(x)
+
+
+def _roc_auc_from_counts(tps, fps):
+    """
+    ROC-AUC from cumulative true/false positive counts at every distinct
+    threshold, in decreasing score order. Tied scores share one threshold and
+    get half credit, as in ``sklearn.metrics.roc_auc_score``.
+    """
+    if len(tps) == 0 or tps[-1] == 0 or fps[-1] == 0:
+        raise ValueError("Only one class present in y_true. ROC AUC score is not defined in that case.")
+    tpr = np.concatenate([[0.0], tps / tps[-1]])
+    fpr = np.concatenate([[0.0], fps / fps[-1]])
+    # Trapezoidal rule
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+
+def _average_precision_from_counts(tps, fps):
+    """
+    Average precision from cumulative true/false positive counts at every
+    distinct threshold, in decreasing score order, as in
+    ``sklearn.metrics.average_precision_score``.
+    """
+    if len(tps) == 0 or tps[-1] == 0:
+        return 0.0
+    precision = tps / (tps + fps)
+    recall = tps / tps[-1]
+    return float(np.sum(np.diff(np.concatenate([[0.0], recall])) * precision))
+
+
+class _StreamingBinaryCurve(object):
+    def __init__(self, num_bins=None, score_range=(0.0, 1.0), max_runs=32):
+        """
+        Accumulates labels and scores chunk by chunk for ranking metrics.
+
+        Parameters
+        ----------
+        num_bins : int, optional
+            If given, scores are counted in ``num_bins`` equal-width bins over
+            ``score_range``, so the state has a fixed size however many
+            predictions are added, and scores in the same bin count as tied.
+            ``None`` keeps every score in sorted runs for the exact metric.
+            Default: ``None``.
+        score_range : tuple, optional
+            ``(low, high)`` range of the histogram bins. Scores outside it go to the
+            first or last bin. Default: ``(0.0, 1.0)``.
+        max_runs : int, optional
+            In exact mode, sorted runs are merged into one once there are more
+            than ``max_runs`` of them. Default: ``32``.
+        """
+        self.num_bins = num_bins
+        self.score_range = tuple(float(v) for v in score_range)
+        self.max_runs = max_runs
+        self.reset()
+
+    def reset(self):
+        if self.num_bins is None:
+            # Runs of (score, label) sorted by increasing score
+            self.runs = []
+        else:
+            self.pos_hist = np.zeros(self.num_bins, dtype=np.int64)
+            self.neg_hist = np.zeros(self.num_bins, dtype=np.int64)
+
+    def update(self, label, score):
+        """
+        Add a chunk of labels (1 for positives) and scores, as torch tensors or arrays.
+        """
+        if self.num_bins is None:
+            score, label = _to_numpy(score).ravel(), _to_numpy(label).ravel().astype(bool)
+            order = np.argsort(score, kind='stable')
+            self.runs.append((score[order], label[order]))
+            if len(self.runs) > self.max_runs:
+                self._merge_runs()
+        else:
+            score, label = torch.as_tensor(score).flatten(), torch.as_tensor(label).flatten().bool()
+            # Binning and counting run on the device of the inputs
+            low, high = self.score_range
+            bins = ((score.double() - low) * (self.num_bins / (high - low))).floor_().clamp_(0, self.num_bins - 1).long()
+            self.pos_hist += torch.bincount(bins[label], minlength=self.num_bins).cpu().numpy()
+            self.neg_hist += torch.bincount(bins[~label], minlength=self.num_bins).cpu().numpy()
+        return self
+
+    def _merge_runs(self):
+        scores = np.concatenate([run[0] for run in self.runs])
+        labels = np.concatenate([run[1] for run in self.runs])
+        # Timsort detects the sorted runs, so this is a k-way merge rather than a full sort
+        order = np.argsort(scores, kind='stable')
+        self.runs = [(scores[order], labels[order])]
+
+    def merge(self, other):
+        """
+        Add the state of another accumulator, e.g. from another shard or worker process.
+        """
+        assert type(other) is type(self), f"Cannot merge {type(other).__name__} into {type(self).__name__}."
+        assert (other.num_bins, other.score_range) == (self.num_bins, self.score_range), \
+            "Cannot merge accumulators with different binning."
+        if self.num_bins is None:
+            self.runs.extend(other.runs)
+            if len(self.runs) > self.max_runs:
+                self._merge_runs()
+        else:
+            self.pos_hist += other.pos_hist
+            self.neg_hist += other.neg_hist
+        return self
+
+    def _counts(self):
+        """
+        Cumulative true/false positive counts at every distinct threshold, by decreasing score.
+        """
+        if self.num_bins is not None:
+            # Every non-empty bin is one threshold
+            pos, neg = self.pos_hist[::-1], self.neg_hist[::-1]
+            keep = (pos + neg) > 0
+            return np.cumsum(pos)[keep], np.cumsum(neg)[keep]
+
+        if not self.runs:
+            return np.zeros(0), np.zeros(0)
+        self._merge_runs()
+        scores, labels = self.runs[0][0][::-1], self.runs[0][1][::-1]
+        threshold_idxs = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+        tps = np.cumsum(labels, dtype=np.int64)[threshold_idxs]
+        fps = threshold_idxs + 1 - tps
+        return tps, fps
+
+
+class StreamingROCAUC(_StreamingBinaryCurve):
+    """
+    Streaming ROC-AUC for binary classification.
+
+    Call ``update(label, score)`` on chunks of predictions and ``compute()`` at
+    the end. States from different shards can be combined with ``merge``. With
+    ``num_bins=None`` the result equals ``eval_roc_auc`` on all predictions;
+    with ``num_bins`` the state has a fixed size and scores are resolved to the
+    bin width.
+
+    Examples
+    --------
+    >>> metric = StreamingROCAUC(num_bins=10000)
+    >>> for label, score in loader:
+    ...     metric.update(label, score)
+    >>> roc_auc = metric.compute()
+    """
+
+    def compute(self):
+        return _roc_auc_from_counts(*self._counts())
+
+
+class StreamingAveragePrecision(_StreamingBinaryCurve):
+    """
+    Streaming average precision for binary classification.
+
+    Same interface as ``StreamingROCAUC``. With ``num_bins=None`` the result
+    equals ``eval_average_precision`` on all predictions.
+    """
+
+    def compute(self):
+        return _average_precision_from_counts(*self._counts())
+
+
+def _cached_metric(func):
+    """
+    Property computed once per state of the confusion matrix, until `matrix` is replaced.
+    """
+    @functools.wraps(func)
+    def cached(self):
+        if func.__name__ not in self._cache:
+            self._cache[func.__name__] = func(self)
+        return self._cache[func.__name__]
+    return property(cached)
 
 class ConfusionMatrix(object):
+    def _keys(self, preds, labels):
+        """
+        Flat `labels * size + preds` index of every counted (label, pred) pair.
+        """
+        preds, labels = preds.detach().reshape(-1), labels.detach().reshape(-1)
+        # Pairs with a label or pred outside [0, size) are not counted
+        valid = (labels >= 0) & (labels < self.size) & (preds >= 0) & (preds < self.size)
+        if preds.is_floating_point():
+            valid &= preds == preds.trunc()
+        if labels.is_floating_point():
+            valid &= labels == labels.trunc()
+        if self.ignore_index is not None:
+            valid &= labels != self.ignore_index
+        return labels[valid].long() * self.size + preds[valid].long()
+
     def _make(self, preds, labels):
-        label_range = torch.arange(self.size, device=preds.device)[None, :]
-        preds_one_hot, labels_one_hot = _one_hot(preds, self.size), _one_hot(labels, self.size)
-        return (labels_one_hot[:, :, None] * preds_one_hot[:, None, :]).sum(dim=0).detach()
+        # A single bincount over the flat (label, pred) index: O(N + size^2) memory
+        counts = torch.bincount(self._keys(preds, labels), minlength=self.size * self.size)
+        return counts.reshape(self.size, self.size)
 
-    def __init__(self, size=2):
+    def __init__(self, size=2, ignore_index=None, sparse=False):
         """
         This class builds and updates a confusion matrix.
         :param size: the number of classes to consider
+        :param ignore_index: label value whose pixels/samples are not counted (e.g. 255 in segmentation masks)
+        :param sparse: keep the matrix as a sparse COO tensor, for class counts where a dense size x size
+            matrix does not fit in memory
         """
-        self.matrix = torch.zeros(size, size)
         self.size = size
+        self.ignore_index = ignore_index
+        self.sparse = sparse
         self._eps = 1e-6
+        self.reset()
+
+    @property
+    def matrix(self):
+        return self._matrix
+
+    @matrix.setter
+    def matrix(self, value):
+        # add() and reset() assign the matrix, which drops the cached metrics.
+        # Modifying the tensor in place (e.g. `cm.matrix[0, 0] = 1`) does not.
+        self._matrix = value
+        self._cache = {}
         
     def reset(self):
-        self.matrix = torch.zeros(self.size, self.size)
+        if self.sparse:
+            self.matrix = torch.sparse_coo_tensor(
+                torch.zeros(2, 0, dtype=torch.long), torch.zeros(0), (self.size, self.size), check_invariants=False
+            ).coalesce()
+        else:
+            self.matrix = torch.zeros(self.size, self.size)
 
     def add(self, preds, labels):
         """
         Updates the confusion matrix using predictions `preds` (e.g. logit.argmax(1)) and ground truth `labels`
         """
         self.matrix = self.matrix.to(preds.device)
-        self.matrix += self._make(preds, labels).float()
+        if self.sparse:
+            keys, counts = torch.unique(self._keys(preds, labels), return_counts=True)
+            indices = torch.stack([keys // self.size, keys % self.size])
+            update = torch.sparse_coo_tensor(indices, counts.float(), (self.size, self.size), check_invariants=False)
+            self.matrix = (self.matrix + update).coalesce()
+        else:
+            self.matrix += self._make(preds, labels).float()
+
+    def state_dict(self):
+        """
+        Returns the configuration and counts of the confusion matrix, on CPU, e.g. for `torch.save`
+        or to send the partial result of a worker process to the main process.
+        """
+        return {
+            "size": self.size,
+            "ignore_index": self.ignore_index,
+            "sparse": self.sparse,
+            "matrix": self.matrix.detach().cpu().clone(),
+        }
+
+    def load_state_dict(self, state_dict):
+        """
+        Restores a state returned by `state_dict`.
+        """
+        self.size = state_dict["size"]
+        self.ignore_index = state_dict["ignore_index"]
+        self.sparse = state_dict["sparse"]
+        self.matrix = state_dict["matrix"].clone()
+        return self
+
+    def merge(self, other):
+        """
+        Adds the counts of another confusion matrix (or of its `state_dict`), e.g. from another shard
+        or DataLoader worker. Counts are integers, so merging is associative and the order does not matter.
+        :param other: a ConfusionMatrix with the same size and ignore_index, dense or sparse
+        """
+        if isinstance(other, dict):
+            other = ConfusionMatrix(other["size"], other["ignore_index"], other["sparse"]).load_state_dict(other)
+        assert isinstance(other, ConfusionMatrix), f"Cannot merge {type(other).__name__} into ConfusionMatrix."
+        assert (other.size, other.ignore_index) == (self.size, self.ignore_index), \
+            f"Cannot merge a confusion matrix of size {other.size} (ignore_index={other.ignore_index}) " \
+            f"into one of size {self.size} (ignore_index={self.ignore_index})."
+        matrix = other.matrix.to(self.matrix.device)
+        if self.sparse:
+            self.matrix = (self.matrix + (matrix if other.sparse else matrix.to_sparse())).coalesce()
+        else:
+            self.matrix = self.matrix + (matrix.to_dense() if other.sparse else matrix)
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def sync(self, group=None):
+        """
+        Sums the confusion matrices of all ranks of `torch.distributed` in place, so that every rank holds
+        the counts of the whole evaluation. Works with gloo (CPU) and nccl (matrix on the GPU). Does nothing
+        when torch.distributed is not initialized. Call it once, after the last `add`: syncing twice counts
+        the other ranks twice.
+        :param group: the process group to reduce over (default: the world)
+        """
+        if not (dist.is_available() and dist.is_initialized()):
+            return self
+        if self.sparse:
+            # Ranks hold different nonzero patterns, so gather them instead of reducing a dense matrix
+            states = [None] * dist.get_world_size(group)
+            dist.all_gather_object(states, self.state_dict(), group=group)
+            device = self.matrix.device
+            self.reset()
+            self.matrix = self.matrix.to(device)
+            for state in states:
+                self.merge(state)
+        else:
+            matrix = self.matrix.clone()
+            dist.all_reduce(matrix, op=dist.ReduceOp.SUM, group=group)
+            self.matrix = matrix
+        return self
+
+    def _diagonal(self):
+        if "diagonal" in self._cache:
+            return self._cache["diagonal"]
+        if not self.sparse:
+            diagonal = self.matrix.diagonal()
+        else:
+            indices, values = self.matrix.indices(), self.matrix.values()
+            on_diagonal = indices[0] == indices[1]
+            diagonal = torch.zeros(self.size, dtype=values.dtype, device=values.device)
+            diagonal.index_add_(0, indices[0][on_diagonal], values[on_diagonal])
+        self._cache["diagonal"] = diagonal
+        return diagonal
+
+    def _totals(self, dim=None):
+        """
+        Sum of the matrix over `dim` (0: per predicted class, 1: per true class, None: everything).
+        """
+        key = ("totals", dim)
+        if key in self._cache:
+            return self._cache[key]
+        if not self.sparse:
+            totals = self.matrix.sum() if dim is None else self.matrix.sum(dim)
+        elif dim is None:
+            totals = self.matrix.values().sum()
+        else:
+            indices, values = self.matrix.indices(), self.matrix.values()
+            totals = torch.zeros(self.size, dtype=values.dtype, device=values.device)
+            totals.index_add_(0, indices[1 - dim], values)
+        self._cache[key] = totals
+        return totals
 
 #     @property
 #     def class_iou(self):
 #         true_pos = self.matrix.diagonal()
 #         return true_pos / (self.matrix.sum(0) + self.matrix.sum(1) - true_pos + self._eps)
 
-    @property
+    @_cached_metric
     def class_iou(self):
-        true_pos = self.matrix.diagonal()
-        denom = self.matrix.sum(0) + self.matrix.sum(1) - true_pos
+        true_pos = self._diagonal()
+        denom = self._totals(0) + self._totals(1) - true_pos
         denom = torch.max(denom, torch.tensor(self._eps))
         return true_pos / denom
 
-    @property
+    @_cached_metric
     def iou(self):
         return self.class_iou.mean()
 
@@ -182,10 +547,10 @@ class ConfusionMatrix(object):
 #         true_pos = self.matrix.diagonal()
 #         return true_pos.sum() / (self.matrix.sum() + self._eps)
 
-    @property
+    @_cached_metric
     def global_accuracy(self):
-        true_pos = self.matrix.diagonal()
-        denom = self.matrix.sum()
+        true_pos = self._diagonal()
+        denom = self._totals()
         denom = torch.max(denom, torch.tensor(self._eps))
         return true_pos.sum() / denom
 
@@ -194,20 +559,21 @@ class ConfusionMatrix(object):
 #         true_pos = self.matrix.diagonal()
 #         return true_pos / (self.matrix.sum(1) + self._eps)
     
-    @property
+    @_cached_metric
     def class_accuracy(self):
-        true_pos = self.matrix.diagonal()
-        denom = self.matrix.sum(1)
+        true_pos = self._diagonal()
+        denom = self._totals(1)
         denom = torch.max(denom, torch.tensor(self._eps))
         return true_pos / denom
 
-    @property
+    @_cached_metric
     def average_accuracy(self):
         return self.class_accuracy.mean()
 
-    @property
+    @_cached_metric
     def per_class(self):
-        return self.matrix / (self.matrix.sum(1, keepdims=True) + self._eps)
+        matrix = self.matrix.to_dense() if self.sparse else self.matrix
+        return matrix / (matrix.sum(1, keepdims=True) + self._eps)
     
 #     @property
 #     def precision(self):
@@ -225,21 +591,21 @@ class ConfusionMatrix(object):
 #         recall = self.recall
 #         return 2 * (precision * recall) / (precision + recall + self._eps)
 
-    @property
+    @_cached_metric
     def precision(self):
-        true_pos = self.matrix.diagonal()
-        denom = self.matrix.sum(0)
+        true_pos = self._diagonal()
+        denom = self._totals(0)
         denom = torch.max(denom, torch.tensor(self._eps))
         return true_pos / denom
 
-    @property
+    @_cached_metric
     def recall(self):
-        true_pos = self.matrix.diagonal()
-        denom = self.matrix.sum(1)
+        true_pos = self._diagonal()
+        denom = self._totals(1)
         denom = torch.max(denom, torch.tensor(self._eps))
         return true_pos / denom
 
-    @property
+    @_cached_metric
     def f1_score(self):
         precision = self.precision
         recall = self.recall
@@ -257,7 +623,7 @@ class ConfusionMatrix(object):
             class_names = [f"Class {i}" for i in range(self.size)]
 
         # Compute support (number of occurrences of each class)
-        support = self.matrix.sum(1)
+        support = self._totals(1)
 
         # Headers
         headers = ["precision", "recall", "f1-score", "support"]
@@ -267,18 +633,14 @@ class ConfusionMatrix(object):
         report = head_fmt.format("", *headers, width=width)
         report += "\n\n"
 
-        # Rows
+        # Rows, from a single transfer of each per-class metric
         row_fmt = "{:>{width}} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
-        for i, class_name in enumerate(class_names):
-            report += row_fmt.format(
-                class_name,
-                self.precision[i].item(),
-                self.recall[i].item(),
-                self.f1_score[i].item(),
-                support[i].int().item(),
-                width=width,
-                digits=digits
-            )
+        rows = zip(class_names, self.precision.tolist(), self.recall.tolist(), self.f1_score.tolist(),
+                   support.int().tolist())
+        report += "".join(
+            row_fmt.format(class_name, precision, recall, f1_score, class_support, width=width, digits=digits)
+            for class_name, precision, recall, f1_score, class_support in rows
+        )
            
         report += f"Accuracy:\t{self.global_accuracy:.{digits}f}"
         if print_report:
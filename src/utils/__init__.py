@@ -1,3 +1,4 @@
+# from .cache_utils import ArrayDiskCache, BufferPool
 # from .colab_utils import download_kaggle_competition_data
 # from .config_utils import BaseCFG
 # from .data_utils import (
@@ -29,13 +30,33 @@
 # )
 # from .image_utils import (
 #     normalize_slice,
+#     normalize_volume,
+#     compute_normalization_stats,
+#     apply_normalization,
 #     intensity_projection,
+#     ProjectionAccumulator,
+#     streaming_intensity_projection,
+#     multi_intensity_projection,
+#     volume_projection,
 #     min_or_max_intensity_projection,
 #     minimum_intensity_projection,
 #     maximum_intensity_projection,
+#     sliding_window_projection,
+#     gaussian_blur_stack,
 #     IntensityProjectionHelper,
 #     load_image,
 #     load_images_parallel,
+#     stream_images,
+#     build_volume_cache,
+#     is_volume_cache_valid,
+#     load_volume_cache,
+#     PYRAMID_LEVELS,
+#     build_pyramid_cache,
+#     is_pyramid_cache_valid,
+#     load_pyramid_level,
+#     Volume,
+#     save_normalization_stats,
+#     load_normalization_stats,
 #     Denoiser,
 # )
 # from .kaggle_utils import (
@@ -55,6 +76,7 @@
 # from .model_utils import (
 #     calculate_class_weights,
 # )
+# from .pipeline_utils import Pipeline, PipelineStage
 # from .print_utils import (
 #     FormattedPrint,
 # )
@@ -67,6 +89,8 @@
 # )
 
 # __all__ = [
+#     "ArrayDiskCache",
+#     "BufferPool",
 #     "download_kaggle_competition_data",
 #     "BaseCFG",
 #     "load_tsv",
@@ -89,13 +113,33 @@
 #     "get_graph_info",
 #     "get_canonical_etypes_set",
 #     "normalize_slice",
+#     "normalize_volume",
+#     "compute_normalization_stats",
+#     "apply_normalization",
 #     "intensity_projection",
+#     "ProjectionAccumulator",
+#     "streaming_intensity_projection",
+#     "multi_intensity_projection",
+#     "volume_projection",
 #     "min_or_max_intensity_projection",
 #     "minimum_intensity_projection",
 #     "maximum_intensity_projection",
+#     "sliding_window_projection",
+#     "gaussian_blur_stack",
 #     "IntensityProjectionHelper",
 #     "load_image",
 #     "load_images_parallel",
+#     "stream_images",
+#     "build_volume_cache",
+#     "is_volume_cache_valid",
+#     "load_volume_cache",
+#     "PYRAMID_LEVELS",
+#     "build_pyramid_cache",
+#     "is_pyramid_cache_valid",
+#     "load_pyramid_level",
+#     "Volume",
+#     "save_normalization_stats",
+#     "load_normalization_stats",
 #     "Denoiser",
 #     "setup_kaggle",
 #     "download_and_copy_kernel_files",
@@ -106,6 +150,8 @@
 #     "TelegramBot",
 #     "apply_operation_divide_conquer",
 #     "calculate_class_weights",
+#     "Pipeline",
+#     "PipelineStage",
 #     "FormattedPrint",
 #     "has_internet",
 #     "run_bash_cmd",
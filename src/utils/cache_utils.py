@@ -0,0 +1,296 @@
+import os
+import hashlib
+import inspect
+import tempfile
+import functools
+import threading
+import contextlib
+import numpy as np
+from PIL import Image
+
+class ArrayDiskCache:
+    BUFFER_ARGUMENTS = ("out", "scratch")
+
+    def __init__(self, cache_dir, max_bytes=10 * 1024 ** 3, low_water=0.9):
+        """
+        Content-addressed on-disk cache for deterministic array transforms.
+
+        Entries are keyed by a hash of the input pixels, the function name and
+        its keyword arguments, stored as compressed `.npz` files, and evicted
+        least-recently-used first once the cache grows beyond `max_bytes`.
+
+        Args:
+            cache_dir (str): Directory holding the cache entries.
+            max_bytes (int): Maximum total size of the cache on disk. Defaults to 10 GiB.
+            low_water (float): Eviction frees space down to `low_water * max_bytes`, so the
+                directory scan it needs runs once per ~(1 - low_water) * max_bytes of new
+                entries rather than on every miss of a full cache.
+        """
+        assert 0 < low_water <= 1, f"Expect low_water in (0, 1], but got {low_water}."
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._entry_paths())
+
+    def __getstate__(self):
+        # Locks cannot be pickled; every process (e.g. a DataLoader worker) gets its own
+        state = self.__dict__.copy()
+        state.pop("_lock")
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _entry_paths(self):
+        for dirpath, dirnames, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith(".npz"):
+                    yield os.path.join(dirpath, filename)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npz")
+
+    @staticmethod
+    def make_key(func_name, array, kwargs, is_image=False):
+        """
+        Hash the input buffer together with the function name and keyword arguments.
+
+        `is_image` tells whether the input was a PIL image: the wrapped functions
+        return the type of their input, so PIL and array calls get separate entries.
+        """
+        array = np.ascontiguousarray(array)
+        h = hashlib.blake2b(digest_size=20)
+        h.update(func_name.encode())
+        h.update(b"image" if is_image else b"array")
+        h.update(repr(sorted(kwargs.items())).encode())
+        h.update(f"{array.dtype.str}{array.shape}".encode())
+        h.update(memoryview(array).cast("B"))
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Return the cached (array, is_image) pair for `key`, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                result = entry["result"], bool(entry["is_image"])
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        # Refresh the modification time, which orders the LRU eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another thread or process since it was read
+            pass
+        with self._lock:
+            self.stats["hits"] += 1
+        return result
+
+    def put(self, key, array, is_image=False):
+        """
+        Store `array` under `key`, evicting old entries if the cache is over budget.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temporary file per call: identical inputs (e.g. blank slices) share a key,
+        # and several threads or processes may store it at the same time
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, result=np.asarray(array), is_image=np.bool_(is_image))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._size += os.path.getsize(path)
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove least-recently-used entries until the cache fits in `low_water * max_bytes`.
+        """
+        target_bytes = int(self.max_bytes * self.low_water)
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        with self._lock:
+            self._size = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if self._size <= target_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self._size -= size
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            for path in list(self._entry_paths()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def wrap(self, func, name=None):
+        """
+        Wrap a single-image function `func(img, *args, **kwargs)` with this cache.
+
+        The wrapped function accepts PIL images or arrays and returns the same
+        type as `func` did when the entry was computed. It is a `CachedFunction`,
+        which can be pickled (e.g. to DataLoader workers or process pools) as
+        long as `func` can.
+
+        Example:
+            >>> cache = ArrayDiskCache("/tmp/denoise_cache", max_bytes=2 * 1024 ** 3)
+            >>> cached_bm3d = cache.wrap(Denoiser.denoise_bm3d)
+            >>> img = cached_bm3d(img, sigma=25)
+            >>> cache.stats, cache.hit_rate
+        """
+        return CachedFunction(self, func, name=name)
+
+class CachedFunction:
+    def __init__(self, cache, func, name=None):
+        """
+        Single-image function `func(img, *args, **kwargs)` backed by an `ArrayDiskCache`,
+        see `ArrayDiskCache.wrap`. A class rather than a closure so that it can be pickled.
+        """
+        self.cache = cache
+        self.func = func
+        self.name = name or func.__qualname__
+        self._signature = None
+        functools.update_wrapper(self, func)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_signature"] = None
+        return state
+
+    def __call__(self, img, *args, **kwargs):
+        if self._signature is None:
+            self._signature = inspect.signature(self.func)
+        # Bind defaults so that positional, keyword and implicit default arguments share entries
+        bound = self._signature.bind(img, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = list(bound.arguments.items())[1:]
+        # Output/scratch buffers do not change the result, so they are not part of the key
+        params = {k: v for k, v in arguments if k not in self.cache.BUFFER_ARGUMENTS}
+
+        key = self.cache.make_key(self.name, np.asarray(img), params, is_image=isinstance(img, Image.Image))
+        cached = self.cache.get(key)
+        if cached is not None:
+            array, is_image = cached
+            out = bound.arguments.get("out")
+            if out is not None:
+                np.copyto(out, array)
+                array = out
+            return Image.fromarray(array) if is_image else array
+
+        result = self.func(img, *args, **kwargs)
+        self.cache.put(key, np.asarray(result), is_image=isinstance(result, Image.Image))
+        return result
+
+class BufferPool:
+    def __init__(self, max_buffers_per_key=8):
+        """
+        Pool of reusable arrays keyed by shape and dtype.
+
+        Hands out preallocated `out=`/`scratch=` buffers for the image helpers,
+        so that processing the slices of a series in steady state reuses the
+        same few arrays instead of allocating new ones for every call. The
+        contents of a buffer are undefined when it is handed out.
+
+        Args:
+            max_buffers_per_key (int): Maximum number of free buffers kept per (shape, dtype).
+
+        Example:
+            >>> pool = BufferPool()
+            >>> with pool.borrow((512, 512), np.uint8) as out:
+            ...     normalize_slice(img, out=out)
+        """
+        self.max_buffers_per_key = max_buffers_per_key
+        self.stats = {"allocations": 0, "reuses": 0}
+        self._free = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(shape, dtype):
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        return shape, np.dtype(dtype).str
+
+    def get(self, shape, dtype):
+        """
+        Return a free C-contiguous buffer of the given shape and dtype, allocating one if needed.
+        """
+        key = self._key(shape, dtype)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.stats["reuses"] += 1
+                return free.pop()
+            self.stats["allocations"] += 1
+        return np.empty(key[0], dtype=key[1])
+
+    def release(self, *buffers):
+        """
+        Return buffers obtained from `get` to the pool.
+        """
+        with self._lock:
+            for buffer in buffers:
+                free = self._free.setdefault(self._key(buffer.shape, buffer.dtype), [])
+                if len(free) < self.max_buffers_per_key:
+                    free.append(buffer)
+
+    @contextlib.contextmanager
+    def borrow(self, shape, dtype):
+        """
+        Context manager handing out a buffer and releasing it on exit.
+        """
+        buffer = self.get(shape, dtype)
+        try:
+            yield buffer
+        finally:
+            self.release(buffer)
+
+    def clear(self):
+        """
+        Drop every free buffer.
+        """
+        with self._lock:
+            self._free.clear()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(buffer.nbytes for free in self._free.values() for buffer in free)
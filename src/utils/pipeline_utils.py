@@ -0,0 +1,244 @@
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# End-of-stream marker passed between stages
+_DONE = object()
+
+class _Stopped(Exception):
+    pass
+
+class _StageError:
+    def __init__(self, stage_name, error):
+        self.stage_name = stage_name
+        self.error = error
+
+def _timed_call(func, item):
+    """
+    Run `func(item)` in a worker and return the result with its duration.
+    """
+    start = time.perf_counter()
+    result = func(item)
+    return result, time.perf_counter() - start
+
+class PipelineStage:
+    def __init__(self, name, func, num_workers=1, executor='thread', max_pending=None, initializer=None,
+                 initargs=()):
+        """
+        One step of a `Pipeline`: a single-item function run on its own worker pool.
+
+        Args:
+            name (str): Name of the stage in the statistics.
+            func (callable): Function applied to every item. For 'process' stages it must be
+                picklable, e.g. a module-level function or a `functools.partial` of one.
+            num_workers (int): Number of workers of this stage.
+            executor (str): 'thread' for I/O or GIL-releasing work (PIL decoding, OpenCV),
+                'process' for Python-heavy work such as BM3D.
+            max_pending (int, optional): Maximum number of items in flight in this stage.
+                Defaults to `2 * num_workers`.
+            initializer (callable, optional): Worker initializer, e.g. to limit OpenCV threads.
+            initargs (tuple): Arguments of `initializer`.
+        """
+        assert executor in ['thread', 'process'], f"Expect executor in ['thread', 'process'], but got {executor}."
+        self.name = name
+        self.func = func
+        self.num_workers = num_workers
+        self.executor = executor
+        self.max_pending = 2 * num_workers if max_pending is None else max_pending
+        self.initializer = initializer
+        self.initargs = initargs
+
+    def make_executor(self):
+        executor_class = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+        return executor_class(max_workers=self.num_workers, initializer=self.initializer, initargs=self.initargs)
+
+class Pipeline:
+    def __init__(self, stages, queue_size=8, poll_interval=0.1):
+        """
+        Streaming executor chaining stages such as load -> normalize -> denoise -> project.
+
+        Every stage has its own worker pool, and stages are connected by bounded
+        queues, so a slow stage applies backpressure upstream instead of letting
+        results pile up in memory. All stages run concurrently: CPU-heavy
+        denoising of early items overlaps with loading of later ones. Items come
+        out in input order.
+
+        Args:
+            stages (list of PipelineStage): The stages, in order.
+            queue_size (int): Capacity of the queue between two stages.
+            poll_interval (float): Seconds between checks for cancellation while blocked.
+
+        Example:
+            >>> pipeline = Pipeline([
+            ...     PipelineStage("load", load_image, num_workers=4),
+            ...     PipelineStage("normalize", normalize_slice, num_workers=2),
+            ...     PipelineStage("denoise", Denoiser.denoise_nlm, num_workers=8, executor='process'),
+            ... ])
+            >>> slices = np.stack([np.asarray(s) for s in pipeline.run(sorted(image_paths))])
+            >>> projections = sliding_window_projection(slices, 2, method='max')
+            >>> print(pipeline.report())
+        """
+        assert len(stages) > 0, "A pipeline needs at least one stage."
+        assert len({stage.name for stage in stages}) == len(stages), "Stage names must be unique."
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.stats = {}
+
+    def _put(self, q, item, stop):
+        while True:
+            if stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=self.poll_interval)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, q, stop):
+        while True:
+            if stop.is_set():
+                raise _Stopped()
+            try:
+                return q.get(timeout=self.poll_interval)
+            except queue.Empty:
+                pass
+
+    def _feed(self, items, outbox, stop):
+        try:
+            for item in items:
+                self._put(outbox, item, stop)
+            self._put(outbox, _DONE, stop)
+        except _Stopped:
+            pass
+        except Exception as e:
+            # Errors travel downstream like items; the consumer raises them and cancels the run
+            try:
+                self._put(outbox, _StageError("input", e), stop)
+            except _Stopped:
+                pass
+
+    def _submit(self, stage, pool, inbox, in_flight, slots, stop):
+        """
+        Take items from the stage's input queue and submit them to its pool, at most `max_pending` at a time.
+        """
+        try:
+            while True:
+                item = self._get(inbox, stop)
+                if item is _DONE or isinstance(item, _StageError):
+                    in_flight.put(item)
+                    return
+                while not slots.acquire(timeout=self.poll_interval):
+                    if stop.is_set():
+                        raise _Stopped()
+                if self.stats[stage.name]["start"] is None:
+                    self.stats[stage.name]["start"] = time.perf_counter()
+                in_flight.put(pool.submit(_timed_call, stage.func, item))
+        except _Stopped:
+            in_flight.put(_DONE)
+        except Exception as e:
+            in_flight.put(_StageError(stage.name, e))
+
+    def _collect(self, stage, in_flight, outbox, slots, stop):
+        """
+        Wait for the stage's results in submission order and pass them downstream.
+        """
+        stats = self.stats[stage.name]
+        try:
+            while True:
+                future = in_flight.get()
+                if future is _DONE or isinstance(future, _StageError):
+                    self._put(outbox, future, stop)
+                    return
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    self._put(outbox, _StageError(stage.name, e), stop)
+                    return
+                finally:
+                    slots.release()
+                stats["items"] += 1
+                stats["busy_seconds"] += seconds
+                # The result is only counted as done once downstream has room for it
+                self._put(outbox, result, stop)
+                stats["end"] = time.perf_counter()
+        except _Stopped:
+            pass
+
+    def run(self, items):
+        """
+        Stream `items` through every stage and yield the final results in input order.
+
+        Statistics are reset at the start of every run and can be read from
+        `stats` or `report()` during or after the run. Stopping the iteration
+        early cancels the remaining work.
+        """
+        self.stats = {
+            stage.name: {"items": 0, "busy_seconds": 0.0, "start": None, "end": None, "num_workers": stage.num_workers}
+            for stage in self.stages
+        }
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        pools = [stage.make_executor() for stage in self.stages]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0], stop), daemon=True)]
+        for stage, pool, inbox, outbox in zip(self.stages, pools, queues[:-1], queues[1:]):
+            in_flight = queue.Queue()
+            slots = threading.Semaphore(stage.max_pending)
+            threads.append(threading.Thread(
+                target=self._submit, args=(stage, pool, inbox, in_flight, slots, stop), daemon=True
+            ))
+            threads.append(threading.Thread(
+                target=self._collect, args=(stage, in_flight, outbox, slots, stop), daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                result = self._get(queues[-1], stop)
+                if result is _DONE:
+                    break
+                if isinstance(result, _StageError):
+                    raise RuntimeError(f"Pipeline stage '{result.stage_name}' failed: {result.error!r}") \
+                        from result.error
+                yield result
+        except _Stopped:
+            pass
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for pool in pools:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def stage_throughput(self):
+        """
+        Per-stage throughput summary of the current or last run.
+
+        Returns:
+            dict: For every stage, the number of items, items per second of wall time,
+                busy seconds summed over workers, and utilization (busy time over
+                wall time x workers). A stage with low utilization is waiting on its
+                neighbours, one close to 1 is the bottleneck.
+        """
+        summary = {}
+        for name, stats in self.stats.items():
+            wall = (stats["end"] - stats["start"]) if stats["start"] is not None and stats["end"] is not None else 0.0
+            summary[name] = {
+                "items": stats["items"],
+                "items_per_sec": stats["items"] / wall if wall > 0 else 0.0,
+                "busy_seconds": stats["busy_seconds"],
+                "utilization": stats["busy_seconds"] / (wall * stats["num_workers"]) if wall > 0 else 0.0,
+            }
+        return summary
+
+    def report(self):
+        """
+        Human-readable table of `stage_throughput`.
+        """
+        lines = []
+        for name, summary in self.stage_throughput().items():
+            lines.append(f"{name:<16} {summary['items']:>8d} items  {summary['items_per_sec']:>10.1f} items/s  "
+                         f"busy {summary['busy_seconds']:>8.2f} s  utilization {summary['utilization']:>6.1%}")
+        return "\n".join(lines)